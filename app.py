@@ -1,31 +1,84 @@
+import asyncio
+import hmac
 import os
 import signal
+from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, Response
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+from fastmcp.server.auth import AccessToken, TokenVerifier
 from server import mcp
 
-# Shutdown state tracking for graceful connection draining
-_shutting_down = False
 
+class _StaticTokenAuth(TokenVerifier):
+    """Accept a single opaque bearer token.
+
+    Tokens of the wrong length are rejected before the constant-time compare,
+    so malformed or enumerated tokens are turned away with no further work.
+    """
 
-def _handle_shutdown(signum, frame):
-    global _shutting_down
-    _shutting_down = True
+    def __init__(self, token: str):
+        super().__init__()
+        self._token = token.encode()
 
+    async def verify_token(self, token: str) -> AccessToken | None:
+        candidate = token.encode()
+        if len(candidate) != len(self._token) or not hmac.compare_digest(candidate, self._token):
+            return None
+        return AccessToken(token=token, client_id="mcp-webarchive", scopes=[])
 
-# Register signal handlers for graceful shutdown detection
-signal.signal(signal.SIGTERM, _handle_shutdown)
-signal.signal(signal.SIGINT, _handle_shutdown)
 
 # Optional authentication via environment variable
 token = os.environ.get("MCP_AUTH_TOKEN")
 if token:
-    from fastmcp.server.auth import BearerAuthProvider
-    mcp.auth = BearerAuthProvider(token=token)
+    mcp.auth = _StaticTokenAuth(token)
 
 # Create ASGI app with MCP mounted at /mcp
 mcp_app = mcp.http_app(path="/mcp")
-app = FastAPI(lifespan=mcp_app.lifespan)
+
+
+def _handle_shutdown(signum, previous, shutdown_event: asyncio.Event):
+    shutdown_event.set()
+    # Chain to the handler we replaced (uvicorn's) so graceful shutdown still runs
+    if callable(previous):
+        previous(signum, None)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Run the MCP lifespan and track shutdown signals on the event loop.
+
+    Handlers are registered with loop.add_signal_handler so they run as normal
+    loop callbacks instead of from a raw signal context.
+    """
+    loop = asyncio.get_running_loop()
+    installed = []
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        previous = signal.getsignal(signum)
+        try:
+            loop.add_signal_handler(signum, _handle_shutdown, signum, previous, app.state.shutdown_event)
+        except (NotImplementedError, RuntimeError):
+            # Not supported on this platform or not in the main thread
+            continue
+        installed.append((signum, previous))
+
+    try:
+        async with mcp_app.lifespan(app):
+            yield
+    finally:
+        for signum, previous in installed:
+            loop.remove_signal_handler(signum)
+            if previous is not None:
+                signal.signal(signum, previous)
+
+
+app = FastAPI(lifespan=lifespan)
+# Shutdown state tracking for graceful connection draining
+app.state.shutdown_event = asyncio.Event()
+
+# Health responses are immutable, so build them once instead of per probe
+_HEALTH_OK = PlainTextResponse("ok", status_code=200)
+_HEALTH_DRAINING = PlainTextResponse("shutting down", status_code=503)
 
 
 @app.get("/health")
@@ -35,9 +88,9 @@ async def health_check():
     Returns 503 during shutdown to signal Traefik to stop routing new requests,
     while existing connections continue to be served.
     """
-    if _shutting_down:
-        return Response(content="shutting down", status_code=503, media_type="text/plain")
-    return Response(content="ok", status_code=200, media_type="text/plain")
+    if app.state.shutdown_event.is_set():
+        return _HEALTH_DRAINING
+    return _HEALTH_OK
 
 
 app.mount("/", mcp_app)
@@ -1,9 +1,13 @@
 """
 FIFO Rate Limiter for MCP servers.
 
-Provides two-level rate limiting (global + per-tool) with a queue-based
-approach. When rate limited, requests wait in a FIFO queue until they
-can proceed or timeout.
+Provides two-level rate limiting (global + per-tool) using the generic
+cell rate algorithm (GCRA). Each limit keeps a single "theoretical arrival
+time"; admitting a request reads and bumps it, so admission is O(1) and
+naturally FIFO by arrival order. When rate limited, requests sleep until
+their reserved slot or fail fast if the slot is beyond max_wait_seconds.
+Waiting is asyncio-native, so a throttled tool call never blocks the
+event loop.
 
 Usage:
     from rate_limiter import RateLimiter, rate_limited
@@ -14,17 +18,20 @@ Usage:
     # Apply to tools
     @mcp.tool(...)
     @rate_limited(limiter)
-    def my_tool(...):
+    async def my_tool(...):
         ...
 """
 
-import json
-import threading
+import asyncio
+import copy
+import inspect
 import time
-from collections import deque
+from collections import defaultdict
 from functools import wraps
 from pathlib import Path
 
+import orjson
+
 
 class RateLimitTimeout(Exception):
     """Raised when a request times out waiting for rate limit."""
@@ -36,179 +43,188 @@ class RateLimiter:
     """
     FIFO rate limiter with two-level limiting (global + per-tool).
 
-    Requests are processed in order. When rate limited, requests wait
-    until they can proceed or timeout after max_wait_seconds.
+    Requests are admitted in arrival order and spaced 1/max_requests_per_second
+    apart, so no one-second window admits more than max_requests_per_second
+    calls. Requests that would have to wait longer than max_wait_seconds time
+    out immediately instead of queueing.
     """
 
+    # config path -> (mtime_ns, parsed config)
+    _config_cache: dict[str, tuple[int, dict]] = {}
+
     def __init__(self, config_path: str = "rate_limits.json"):
         """
         Initialize the rate limiter.
 
         Args:
             config_path: Path to rate_limits.json config file.
+
+        Raises:
+            ValueError: If a configured max_requests_per_second is not positive.
         """
         self.config = self._load_config(config_path)
-        self._global_timestamps: deque[float] = deque()
-        self._tool_timestamps: dict[str, deque[float]] = {}
-        self._lock = threading.Lock()
-        # FIFO queue: list of (event, tool_name) tuples
-        self._queue: deque[tuple[threading.Event, str]] = deque()
-        self._queue_lock = threading.Lock()
+        # Config is immutable after load; resolve limits once
+        self._global_limit: float = self.config["max_requests_per_second"]
+        self._tool_limit: dict[str, float] = {
+            name: tool.get("max_requests_per_second", self._global_limit)
+            for name, tool in self.config.get("tools", {}).items()
+        }
+        # Slots are spaced 1/limit apart, so a zero or negative limit has no meaning
+        for name, limit in [("global", self._global_limit), *self._tool_limit.items()]:
+            if not limit > 0:
+                raise ValueError(
+                    f"max_requests_per_second for '{name}' must be positive, got {limit!r}"
+                )
+        self._max_wait: float = self.config.get("max_wait_seconds", 120)
+        # Theoretical arrival time of the next request, per limit. Slots are on
+        # the time.monotonic() clock so wallclock (NTP) steps cannot stall them.
+        self._global_next: float = 0.0
+        self._tool_next: defaultdict[str, float] = defaultdict(float)
+        # Tool names are a small fixed set; pre-insert configured ones
+        for name in self._tool_limit:
+            self._tool_next[name] = 0.0
+        # Created lazily on first acquire: there may be no running loop at import
+        self._lock: asyncio.Lock | None = None
+        self._waiting = 0
+        self._next_sweep: float = 0.0
 
     def _load_config(self, config_path: str) -> dict:
-        """Load config from JSON file or return defaults."""
-        path = Path(config_path)
-        if path.exists():
-            with open(path) as f:
-                return json.load(f)
-        return {
-            "max_requests_per_second": 10,
-            "max_wait_seconds": 120,
-            "tools": {},
-        }
+        """Load config from JSON file or return defaults.
+
+        Parsed configs are memoized by path and mtime, so constructing
+        several limiters (tests, reloads) parses the file only once. Each
+        limiter gets its own copy, so changing one config never leaks into
+        other limiters.
+        """
+        path = Path(config_path).absolute()
+        try:
+            mtime = path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return {
+                "max_requests_per_second": 10,
+                "max_wait_seconds": 120,
+                "tools": {},
+            }
+        key = str(path)
+        cached = self._config_cache.get(key)
+        if cached is None or cached[0] != mtime:
+            cached = (mtime, orjson.loads(path.read_bytes()))
+            self._config_cache[key] = cached
+        return copy.deepcopy(cached[1])
 
     def _get_tool_limit(self, tool_name: str) -> float:
         """Get rate limit for a specific tool."""
-        tools = self.config.get("tools", {})
-        if tool_name in tools:
-            return tools[tool_name].get(
-                "max_requests_per_second", self.config["max_requests_per_second"]
-            )
-        return self.config["max_requests_per_second"]
+        return self._tool_limit.get(tool_name, self._global_limit)
 
-    def _clean_old_timestamps(self, timestamps: deque, window: float = 1.0) -> None:
-        """Remove timestamps older than the window."""
-        cutoff = time.time() - window
-        while timestamps and timestamps[0] < cutoff:
-            timestamps.popleft()
+    @staticmethod
+    def _delay(next_slot: float, now: float) -> float:
+        """Seconds until a limit with the given next slot admits a request."""
+        return max(0.0, next_slot - now)
 
-    def _calculate_wait_time(self, tool_name: str) -> float:
+    def _get_lock(self) -> asyncio.Lock:
+        """Return the admission lock, creating it on first use."""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    def _sweep_idle(self, now: float) -> None:
         """
-        Calculate how long until a request can proceed.
+        Drop slots of unconfigured tools that have gone idle.
 
-        Returns 0 if the request can proceed immediately.
+        A slot in the past behaves exactly like a missing one, so this only
+        bounds memory for servers that see many distinct tool names.
+        """
+        idle = [
+            tool
+            for tool, next_slot in self._tool_next.items()
+            if next_slot <= now and tool not in self._tool_limit
+        ]
+        for tool in idle:
+            del self._tool_next[tool]
+        self._next_sweep = now + 60.0
+
+    def _try_admit(self, tool_name: str, now: float) -> float:
         """
-        global_limit = self.config["max_requests_per_second"]
+        Check both limits and reserve a slot in one critical section.
+
+        Returns how long the caller must wait before proceeding (0.0 to
+        proceed immediately). The slot is already recorded on return.
+
+        Raises:
+            RateLimitTimeout: If the request would wait longer than max_wait_seconds.
+        """
+        if now >= self._next_sweep:
+            self._sweep_idle(now)
+
+        max_wait = self._max_wait
+        global_limit = self._global_limit
         tool_limit = self._get_tool_limit(tool_name)
-        now = time.time()
-        wait_times = []
-
-        # Check global limit
-        self._clean_old_timestamps(self._global_timestamps)
-        if len(self._global_timestamps) >= global_limit:
-            oldest = self._global_timestamps[0]
-            wait_times.append(oldest + 1.0 - now)
-
-        # Check tool-specific limit
-        if tool_name not in self._tool_timestamps:
-            self._tool_timestamps[tool_name] = deque()
-        self._clean_old_timestamps(self._tool_timestamps[tool_name])
-        if len(self._tool_timestamps[tool_name]) >= tool_limit:
-            oldest = self._tool_timestamps[tool_name][0]
-            wait_times.append(oldest + 1.0 - now)
-
-        return max(wait_times) if wait_times else 0.0
-
-    def _record_call(self, tool_name: str) -> None:
-        """Record a call timestamp for rate limiting."""
-        now = time.time()
-        self._global_timestamps.append(now)
-        if tool_name not in self._tool_timestamps:
-            self._tool_timestamps[tool_name] = deque()
-        self._tool_timestamps[tool_name].append(now)
-
-    def _notify_next(self) -> None:
-        """Notify the next request in queue that it can try to proceed."""
-        with self._queue_lock:
-            if self._queue:
-                self._queue[0][0].set()
-
-    def acquire(self, tool_name: str) -> None:
+        tool_next = self._tool_next[tool_name]
+
+        wait_time = max(
+            self._delay(self._global_next, now),
+            self._delay(tool_next, now),
+        )
+        if wait_time > max_wait:
+            raise RateLimitTimeout(
+                f"Rate limit timeout after {max_wait}s waiting for '{tool_name}'"
+            )
+        # Reserve our slot; later callers line up behind it
+        admitted_at = now + wait_time
+        self._global_next = max(admitted_at, self._global_next) + 1.0 / global_limit
+        self._tool_next[tool_name] = max(admitted_at, tool_next) + 1.0 / tool_limit
+        return wait_time
+
+    async def acquire(self, tool_name: str) -> None:
         """
-        Acquire rate limit permission. Blocks until allowed or raises timeout.
+        Acquire rate limit permission. Waits until allowed or raises timeout.
 
         Args:
             tool_name: Name of the tool being called.
 
         Raises:
-            RateLimitTimeout: If request times out waiting for rate limit.
+            RateLimitTimeout: If the request would wait longer than max_wait_seconds.
         """
-        max_wait = self.config.get("max_wait_seconds", 120)
-        start_time = time.time()
+        async with self._get_lock():
+            wait_time = self._try_admit(tool_name, time.monotonic())
+
+        # Sleep outside the lock so other callers can reserve their slots
+        if wait_time > 0:
+            self._waiting += 1
+            try:
+                await asyncio.sleep(wait_time)
+            finally:
+                self._waiting -= 1
+
+    def acquire_sync(self, tool_name: str) -> None:
+        """
+        Blocking variant of acquire for synchronous tools.
 
-        # Create event for this request and join queue
-        my_event = threading.Event()
-        with self._queue_lock:
-            self._queue.append((my_event, tool_name))
-            # If we're first in queue, we can start trying immediately
-            if len(self._queue) == 1:
-                my_event.set()
+        Sync tools run on the event loop thread, so this shares state with
+        acquire without locking.
 
-        try:
-            while True:
-                # Wait for our turn (notified when at front of queue)
-                elapsed = time.time() - start_time
-                remaining = max_wait - elapsed
-                if remaining <= 0:
-                    raise RateLimitTimeout(
-                        f"Rate limit timeout after {max_wait}s waiting for '{tool_name}'"
-                    )
-
-                # Wait for notification or periodic check
-                my_event.wait(timeout=min(0.1, remaining))
-
-                # Check if we're at front of queue
-                with self._queue_lock:
-                    if not self._queue or self._queue[0][0] is not my_event:
-                        my_event.clear()
-                        continue
-
-                # We're at front - try to acquire
-                with self._lock:
-                    wait_time = self._calculate_wait_time(tool_name)
-                    if wait_time <= 0:
-                        # Can proceed
-                        self._record_call(tool_name)
-                        with self._queue_lock:
-                            self._queue.popleft()
-                        self._notify_next()
-                        return
-
-                # Need to wait for rate limit
-                elapsed = time.time() - start_time
-                remaining = max_wait - elapsed
-                if remaining <= 0:
-                    raise RateLimitTimeout(
-                        f"Rate limit timeout after {max_wait}s waiting for '{tool_name}'"
-                    )
-
-                # Sleep until rate limit allows (or timeout)
-                sleep_time = min(wait_time + 0.01, remaining)
-                time.sleep(sleep_time)
-
-        except Exception:
-            # Clean up: remove from queue on any exception
-            with self._queue_lock:
-                self._queue = deque(
-                    (e, t) for e, t in self._queue if e is not my_event
-                )
-            self._notify_next()
-            raise
+        Raises:
+            RateLimitTimeout: If the request would wait longer than max_wait_seconds.
+        """
+        wait_time = self._try_admit(tool_name, time.monotonic())
+        if wait_time > 0:
+            time.sleep(wait_time)
 
     def get_status(self) -> dict:
         """Get current rate limiter status for debugging."""
-        with self._lock:
-            self._clean_old_timestamps(self._global_timestamps)
-            return {
-                "global_calls_last_second": len(self._global_timestamps),
-                "global_limit": self.config["max_requests_per_second"],
-                "queue_depth": len(self._queue),
-                "tool_calls": {
-                    tool: len(ts)
-                    for tool, ts in self._tool_timestamps.items()
-                    if ts
-                },
-            }
+        now = time.monotonic()
+        self._sweep_idle(now)
+        global_limit = self._global_limit
+        return {
+            "global_limit": global_limit,
+            "global_delay_seconds": self._delay(self._global_next, now),
+            "waiting": self._waiting,
+            "tool_delays": {
+                tool: self._delay(next_slot, now)
+                for tool, next_slot in self._tool_next.items()
+                if next_slot > now
+            },
+        }
 
 
 def rate_limited(limiter: RateLimiter):
@@ -227,9 +243,18 @@ def rate_limited(limiter: RateLimiter):
     """
 
     def decorator(func):
+        if inspect.iscoroutinefunction(func):
+
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                await limiter.acquire(func.__name__)
+                return await func(*args, **kwargs)
+
+            return async_wrapper
+
         @wraps(func)
         def wrapper(*args, **kwargs):
-            limiter.acquire(func.__name__)
+            limiter.acquire_sync(func.__name__)
             return func(*args, **kwargs)
 
         return wrapper
@@ -5,17 +5,26 @@ Useful for retrieving historical content, verifying past information, and tracki
 changes to websites over time.
 """
 
-import json
-from datetime import datetime
-from typing import Annotated
+import asyncio
+import time
+from collections import namedtuple
+from collections.abc import Awaitable
+from contextlib import asynccontextmanager
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Annotated, TypeVar
+from urllib.parse import urlparse
 
 from dotenv import load_dotenv
 
 load_dotenv()
 
-import html2text
 import httpx
+import orjson
+from async_lru import alru_cache
 from fastmcp import FastMCP
+from html_to_markdown import ConversionOptions, convert
+from tenacity import retry, retry_if_exception, stop_after_attempt, stop_any, wait_exponential_jitter
 
 from rate_limiter import RateLimiter, rate_limited
 
@@ -34,20 +43,196 @@ def _resolve_cutoff_date(cutoff_date: str | None = None) -> str:
 WAYBACK_CDX_API = "https://web.archive.org/cdx/search/cdx"
 WAYBACK_BASE_URL = "https://web.archive.org/web"
 
+# Request timeouts in seconds, per kind of Wayback request
+HTTP_TIMEOUTS = {
+    "cdx": 30,  # Snapshot listings (client default)
+    "snapshot_lookup": 60,
+    "page": 60,
+    "diagnostics": 15,
+    "search": 20,
+}
+
+# Connecting should be quick even when the archive is slow to answer, so a
+# dead connection fails fast instead of using the whole request timeout
+CONNECT_TIMEOUT = 10.0
+
+USER_AGENT = "mcp-webarchive/1.0"
+
+# Most CDX requests in flight at once. Multi-year listings fan out to every
+# year and URL variant, and over HTTP/2 they all share one connection, so the
+# connection pool does not bound them; bursts beyond this draw 429s.
+CDX_MAX_CONCURRENCY = 6
+
+# archive.org throttles with 429 and has transient 5xx; those are retried
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+RETRY_ATTEMPTS = 4
+RETRY_MAX_WAIT = 8.0
+
+# How long a hit on a URL variant waits for earlier (preferred) variants
+VARIANT_GRACE_SECONDS = 0.05
+
+# Maximum number of characters of page text returned to the model
+MAX_PAGE_CHARS = 50000
+
+# Maximum number of bytes of an archived page to download and parse. Markup
+# runs several bytes per character of text, so this is derived from the text cap.
+MAX_PAGE_BYTES = 4 * MAX_PAGE_CHARS + 64 * 1024
+PAGE_CHUNK_BYTES = 64 * 1024
+
+# Content types converted to markdown; anything else (PDFs, images, ...) is skipped
+HTML_CONTENT_TYPES = frozenset({"text/html", "application/xhtml+xml"})
+
+# Markdown conversion settings, built once and reused for every page
+_MARKDOWN_OPTIONS = ConversionOptions(heading_style="atx", skip_images=True, extract_metadata=False)
+
+# URLs repeat heavily across tool calls and diagnostic loops; ParseResult is
+# an immutable namedtuple, so parsed results can be shared safely
+_urlparse = lru_cache(maxsize=4096)(urlparse)
+
+# One CDX row as listed by list_available_snapshots; year is only set by the
+# years branch. Converted to dicts just before JSON output.
+Snapshot = namedtuple("Snapshot", "date timestamp archive_url year", defaults=(None,))
+
+# Extensions that mark the last path segment as a file; dotted names outside
+# this set (e.g. "john.doe", "v2.10") still get .html/.htm/slash variants
+_FILE_EXTENSIONS = frozenset({
+    "html", "htm", "shtml", "xhtml", "php", "asp", "aspx", "jsp", "cfm", "cgi", "pl",
+    "pdf", "txt", "xml", "json", "rss", "csv", "doc", "docx", "xls", "xlsx", "ppt", "pptx",
+    "jpg", "jpeg", "png", "gif", "svg", "webp", "ico", "css", "js",
+    "zip", "gz", "tar", "mp3", "mp4",
+})
+
+# Suffixes tried on extensionless URLs, in order of preference
+_VARIANT_SUFFIXES = (".html", ".htm", "/")
+
 # Rate limiter instance
 _limiter = RateLimiter()
 
+# Shared HTTP client so every tool call reuses pooled (HTTP/2) connections to
+# web.archive.org instead of paying a TCP+TLS handshake per call
+_client: httpx.AsyncClient | None = None
+
+# Held per CDX request attempt (not across retry backoff or cache hits)
+_cdx_slots = asyncio.Semaphore(CDX_MAX_CONCURRENCY)
+
+
+def _get_client() -> httpx.AsyncClient:
+    """Return the shared HTTP client, creating it on first use."""
+    global _client
+    if _client is None or _client.is_closed:
+        # One HTTP/2 connection serves both CDX and page fetches (same host).
+        # With brotli installed, httpx advertises "br" alongside gzip/deflate.
+        _client = httpx.AsyncClient(
+            http2=True,
+            timeout=_timeout(HTTP_TIMEOUTS["cdx"]),
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+            headers={"User-Agent": USER_AGENT},
+        )
+    return _client
+
+
+@lru_cache(maxsize=None)
+def _timeout(seconds: float) -> httpx.Timeout:
+    """Request timeout with the shorter connect limit (a bare number would override it)."""
+    return httpx.Timeout(seconds, connect=CONNECT_TIMEOUT)
+
+
+def _is_transient(exc: BaseException) -> bool:
+    """Connection failures, throttling/5xx responses and garbled CDX bodies are worth retrying."""
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code in RETRY_STATUSES
+    return isinstance(exc, (httpx.TransportError, httpx.DecodingError))
+
+
+_backoff = wait_exponential_jitter(multiplier=0.5, max=RETRY_MAX_WAIT)
+
+
+def _retry_after(retry_state) -> float | None:
+    """Seconds the server asked us to wait (numeric Retry-After), if any."""
+    exc = retry_state.outcome.exception()
+    if isinstance(exc, httpx.HTTPStatusError):
+        retry_after = exc.response.headers.get("Retry-After", "")
+        if retry_after.isdigit():
+            return float(retry_after)
+    return None
+
+
+def _retry_after_too_long(retry_state) -> bool:
+    """Give up when the server's requested wait exceeds what a tool call can afford."""
+    retry_after = _retry_after(retry_state)
+    return retry_after is not None and retry_after > RETRY_MAX_WAIT
+
+
+def _retry_wait(retry_state) -> float:
+    """Honor a numeric Retry-After header, otherwise back off exponentially with jitter."""
+    retry_after = _retry_after(retry_state)
+    if retry_after is not None:
+        return retry_after
+    return _backoff(retry_state)
+
+
+# Applied under the caches, so one cached (single-flight) call owns the retries
+_retry_transient = retry(
+    retry=retry_if_exception(_is_transient),
+    stop=stop_any(stop_after_attempt(RETRY_ATTEMPTS), _retry_after_too_long),
+    wait=_retry_wait,
+    reraise=True,
+)
+
+
+@asynccontextmanager
+async def _lifespan(server: FastMCP):
+    """Close the shared HTTP client on shutdown."""
+    global _client
+    try:
+        yield {}
+    finally:
+        if _client is not None:
+            await _client.aclose()
+            _client = None
+
+
 mcp = FastMCP(
     name="webarchive",
     instructions="""Access historical webpage snapshots from the Internet Archive Wayback Machine.
 This datasource provides archived versions of websites captured over time, allowing you to see how
 webpages looked at specific points in the past. Useful for retrieving historical content, verifying
 past information, and tracking changes to websites over time.""".strip(),
+    lifespan=_lifespan,
 )
 
 
-async def find_snapshot_before_date(client: httpx.AsyncClient, url: str, target_date: str) -> dict | None:
+def _cdx_rows(resp: httpx.Response) -> list | None:
+    """Rows of a CDX JSON response (header row first), or None if it has no captures.
+
+    Empty bodies and "[]" mean no captures. A non-JSON body (an HTML error page,
+    "error: timed out" as text/plain) or one that fails to decode is a failed
+    query, not an answer: it raises httpx.DecodingError, which is retried and
+    never cached.
+    """
+    body = resp.content
+    if len(body) < 3:
+        return None
+    content_type = resp.headers.get("content-type", "")
+    if "json" not in content_type:
+        raise httpx.DecodingError(f"CDX returned {content_type or 'no content type'}, not JSON", request=resp.request)
+    try:
+        data = orjson.loads(body)
+    except orjson.JSONDecodeError as exc:
+        raise httpx.DecodingError(f"CDX returned malformed JSON: {exc}", request=resp.request) from exc
+    return data if len(data) > 1 else None
+
+
+# Past captures never change, so CDX lookups are cached. Results (including
+# None for "no snapshot") are shared between callers and must not be mutated.
+# alru_cache also stores the in-flight future, so concurrent identical calls
+# share a single request (single-flight).
+@alru_cache(maxsize=2048, ttl=3600)
+@_retry_transient
+async def find_snapshot_before_date(url: str, target_date: str) -> dict | None:
     """Query the CDX API to find the most recent snapshot at or before target_date."""
+    client = _get_client()
     timestamp = target_date.replace("-", "")
     params = {
         "url": url,
@@ -58,46 +243,185 @@ async def find_snapshot_before_date(client: httpx.AsyncClient, url: str, target_
         "limit": 1,
         "sort": "reverse",  # Most recent first
     }
-    resp = await client.get(WAYBACK_CDX_API, params=params)
+    async with _cdx_slots:
+        resp = await client.get(WAYBACK_CDX_API, params=params, timeout=_timeout(HTTP_TIMEOUTS["snapshot_lookup"]))
     resp.raise_for_status()
-    try:
-        data = resp.json()
-        if len(data) > 1:  # First row is header, second is data
-            headers = data[0]
-            row = data[1]
-            row_dict = dict(zip(headers, row))
-            timestamp = row_dict.get("timestamp", "")
-            original_url = row_dict.get("original", url)
-            return {
-                "timestamp": timestamp,
-                "url": f"{WAYBACK_BASE_URL}/{timestamp}/{original_url}",
-            }
-    except json.JSONDecodeError:
-        pass
+    data = _cdx_rows(resp)
+    if data:
+        headers = data[0]
+        row = data[1]
+        timestamp = row[headers.index("timestamp")]
+        original_url = row[headers.index("original")] or url
+        return {
+            "timestamp": timestamp,
+            "url": f"{WAYBACK_BASE_URL}/{timestamp}/{original_url}",
+        }
     return None
 
 
-async def fetch_archived_page(client: httpx.AsyncClient, archive_url: str) -> str:
+# Lookup answers for the day of the capture they found, keyed by (url, YYYYMMDD).
+# When the latest capture at or before D falls on an earlier day E, it is also
+# the latest capture on E, so a later lookup for E needs no CDX query. Listing
+# rows are not recorded: collapse=timestamp:8 does not keep a day's latest.
+_KNOWN_SNAPSHOTS_MAX = 4096
+_KNOWN_SNAPSHOTS_TTL = 3600  # Same lifetime as the lookup cache
+_known_snapshots: dict[tuple[str, str], tuple[float, dict]] = {}
+
+
+def _remember_snapshot(url: str, snapshot: dict) -> None:
+    """Record a lookup answer under its capture day (oldest entries evicted first)."""
+    if len(_known_snapshots) >= _KNOWN_SNAPSHOTS_MAX:
+        del _known_snapshots[next(iter(_known_snapshots))]
+    _known_snapshots[(url, snapshot["timestamp"][:8])] = (time.monotonic() + _KNOWN_SNAPSHOTS_TTL, snapshot)
+
+
+async def _snapshot_before_date(url: str, target_date: str) -> dict | None:
+    """find_snapshot_before_date, answered from earlier lookups that found a capture on target_date."""
+    day = target_date.replace("-", "")
+    known = _known_snapshots.get((url, day))
+    if known is not None:
+        expires, snapshot = known
+        if expires > time.monotonic():
+            return snapshot
+        del _known_snapshots[(url, day)]
+    try:
+        snapshot = await find_snapshot_before_date(url, target_date)
+    except httpx.DecodingError:
+        # Still garbled after retries: report no snapshot for this call only
+        return None
+    # A capture on target_date itself is already cached under this lookup
+    if snapshot and snapshot["timestamp"][:8] != day:
+        _remember_snapshot(url, snapshot)
+    return snapshot
+
+
+# A capture at a given timestamp/url never changes, so converted pages are
+# cached without expiry (bounded by count; each entry is at most ~50k chars)
+@alru_cache(maxsize=64)
+@_retry_transient
+async def fetch_archived_page(archive_url: str) -> str:
     """Fetch the archived page content and convert to text."""
-    resp = await client.get(archive_url)
-    resp.raise_for_status()
-    html_content = resp.text
+    client = _get_client()
+    # Stream the body and stop early: only ~50k chars of text are kept, so
+    # there is no point downloading or parsing multi-megabyte pages in full
+    buf = bytearray()
+    async with client.stream("GET", archive_url, timeout=_timeout(HTTP_TIMEOUTS["page"])) as resp:
+        resp.raise_for_status()
+        content_type = resp.headers.get("content-type", "").split(";", 1)[0].strip().lower()
+        if content_type and content_type not in HTML_CONTENT_TYPES:
+            # Binary or non-HTML capture: don't download it just to feed the converter
+            return f"[Archived content is {content_type}, not HTML, so it was not converted to text.]"
+        async for chunk in resp.aiter_bytes(PAGE_CHUNK_BYTES):
+            buf += chunk
+            if len(buf) >= MAX_PAGE_BYTES:
+                # Cut before the last tag start so neither a tag nor a multi-byte
+                # character is split, and only the kept prefix gets decoded
+                cut = buf.rfind(b"<", 0, MAX_PAGE_BYTES)
+                del buf[cut if cut > 0 else MAX_PAGE_BYTES:]
+                break
+        encoding = resp.charset_encoding or "utf-8"
+
+    # Decoding and conversion are CPU-bound; keep them off the event loop so
+    # concurrent tool calls are not stalled behind a large page
+    return await asyncio.to_thread(_page_to_markdown, buf, encoding)
+
+
+def _page_to_markdown(body: bytes | bytearray, encoding: str) -> str:
+    """Decode an HTML body and convert it to size-capped markdown."""
+    try:
+        html_content = body.decode(encoding, errors="replace")
+    except LookupError:
+        html_content = body.decode("utf-8", errors="replace")
 
-    h = html2text.HTML2Text()
-    h.ignore_links = False
-    h.ignore_images = True
-    h.ignore_emphasis = False
-    h.body_width = 0  # Don't wrap text
-    text_content = h.handle(html_content)
+    # Convert to markdown (keeps headings and links) with the Rust converter
+    text_content = convert(html_content, _MARKDOWN_OPTIONS).content
 
     # Limit output size to avoid overwhelming context
-    max_chars = 50000
-    if len(text_content) > max_chars:
-        text_content = text_content[:max_chars] + "\n\n[Content truncated due to length...]"
+    if len(text_content) > MAX_PAGE_CHARS:
+        text_content = text_content[:MAX_PAGE_CHARS] + "\n\n[Content truncated due to length...]"
 
     return text_content
 
 
+def _dump_json(result: dict) -> str:
+    """Serialize a tool result as indented JSON (year keys in snapshots_by_year are ints)."""
+    return orjson.dumps(result, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS).decode()
+
+
+T = TypeVar("T")
+
+
+async def _first_hit(lookups: list[Awaitable[T]], grace: float | None = None) -> tuple[int, T] | tuple[None, None]:
+    """Run lookups concurrently and return (index, result) of the first truthy result.
+
+    "First" is by position, not completion time, so the answer matches probing
+    serially; once a lookup hits, the ones after it are cancelled. Wall time is
+    bounded by the slowest lookup up to the hit rather than the sum of all of them.
+
+    With grace set, a hit only waits that many seconds for earlier lookups to
+    finish; after that the earliest hit so far is returned.
+    """
+    loop = asyncio.get_running_loop()
+    tasks = [asyncio.ensure_future(lookup) for lookup in lookups]
+    index = {task: i for i, task in enumerate(tasks)}
+    deadline = None
+    try:
+        while True:
+            # Results are read in position order, so errors surface as they would serially
+            for i, task in enumerate(tasks):
+                if not task.done():
+                    break
+                if result := task.result():
+                    return i, result
+            else:
+                return None, None
+
+            hits = [i for i, task in enumerate(tasks) if task.done() and not task.exception() and task.result()]
+            timeout = None
+            if hits and grace is not None:
+                deadline = deadline or loop.time() + grace
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    return hits[0], tasks[hits[0]].result()
+
+            # Only lookups ahead of the best hit can still change the answer
+            best = hits[0] if hits else len(tasks)
+            waiting = [task for task in tasks[:best] if not task.done()]
+            await asyncio.wait(waiting, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def _query_cdx(params: dict, timeout: float) -> list | None:
+    """Run a CDX query and return its rows (header row first), or None if it failed or found nothing."""
+    try:
+        return await _query_cdx_cached(tuple(sorted(params.items())), timeout)
+    except httpx.HTTPError:
+        return None
+
+
+@alru_cache(maxsize=1024, ttl=3600)
+@_retry_transient
+async def _query_cdx_cached(params: tuple, timeout: float) -> list | None:
+    """Cached CDX query. Empty results are cached too; failures raise and are not."""
+    async with _cdx_slots:
+        resp = await _get_client().get(WAYBACK_CDX_API, params=dict(params), timeout=_timeout(timeout))
+    resp.raise_for_status()
+    return _cdx_rows(resp)
+
+
+def _parse_ymd(value: str) -> date:
+    """Parse a YYYY-MM-DD date, raising ValueError for any other shape.
+
+    date.fromisoformat is C-fast but also accepts forms like "20240115", which
+    would break the dashed-string comparisons and to= params downstream.
+    """
+    if len(value) != 10 or value[4] != "-" or value[7] != "-":
+        raise ValueError(f"Expected YYYY-MM-DD, got {value!r}")
+    return date.fromisoformat(value)
+
+
 def parse_wayback_timestamp(timestamp: str) -> str:
     """Convert Wayback timestamp (YYYYMMDDHHMMSS) to YYYY-MM-DD format."""
     if len(timestamp) >= 8:
@@ -105,22 +429,34 @@ def parse_wayback_timestamp(timestamp: str) -> str:
     return timestamp
 
 
+def _split_http(url: str) -> tuple[str, str]:
+    """Split an absolute URL into (netloc, path) without the cost of urlparse.
+
+    Query string and fragment are dropped; an empty path becomes "/".
+    """
+    i = url.find("://")
+    rest = url[i + 3:] if i != -1 else url
+    rest = rest.partition("#")[0].partition("?")[0]
+    slash = rest.find("/")
+    if slash == -1:
+        return rest, "/"
+    return rest[:slash], rest[slash:]
+
+
 def extract_domain(url: str) -> str:
     """Extract domain from URL."""
-    from urllib.parse import urlparse
-    parsed = urlparse(url)
+    parsed = _urlparse(url)
     return parsed.netloc or parsed.path.split("/")[0]
 
 
-async def get_domain_diagnostics(
-    client: httpx.AsyncClient,
-    url: str,
-    cutoff_date: str | None = None
-) -> dict:
-    """Check if domain has any captures and suggest alternatives."""
-    from urllib.parse import urlparse
+async def get_domain_diagnostics(url: str, cutoff_date: str | None = None) -> dict:
+    """Check if domain has any captures and suggest alternatives.
 
-    parsed = urlparse(url)
+    Not cached itself: the CDX query goes through _query_cdx, which caches
+    answers but not failures, so a throttled or timed-out request is retried
+    on the next call instead of being reported as "domain not archived".
+    """
+    parsed = _urlparse(url)
     domain = parsed.netloc
     path = parsed.path
 
@@ -150,35 +486,34 @@ async def get_domain_diagnostics(
     }
 
     try:
-        resp = await client.get(WAYBACK_CDX_API, params=params, timeout=15)
-        if resp.status_code == 200:
-            data = resp.json()
-            if len(data) > 1:
-                diagnostics["domain_has_captures"] = True
-                headers = data[0]
-
-                # Extract unique paths
-                seen_paths = set()
-                for row in data[1:]:
-                    row_dict = dict(zip(headers, row))
-                    original = row_dict.get("original", "")
-                    timestamp = row_dict.get("timestamp", "")
-
-                    # Filter by cutoff date
-                    if cutoff_date:
-                        snapshot_date = parse_wayback_timestamp(timestamp)
-                        if snapshot_date > cutoff_date:
-                            continue
-
-                    # Extract path from URL
-                    try:
-                        orig_parsed = urlparse(original)
-                        orig_path = orig_parsed.path or "/"
-                        if orig_path not in seen_paths and len(seen_paths) < 10:
-                            seen_paths.add(orig_path)
-                            diagnostics["sample_archived_paths"].append(orig_path)
-                    except Exception:
-                        continue
+        data = await _query_cdx(params, HTTP_TIMEOUTS["diagnostics"])
+        if data:
+            diagnostics["domain_has_captures"] = True
+            headers = data[0]
+            i_orig = headers.index("original")
+            i_ts = headers.index("timestamp")
+
+            # Extract unique paths
+            seen_paths = set()
+            for row in data[1:]:
+                original = row[i_orig]
+
+                # Extra safety: to= already bounds rows by cutoff
+                if cutoff_date and parse_wayback_timestamp(row[i_ts]) > cutoff_date:
+                    continue
+
+                # Extract path from URL
+                try:
+                    orig_parsed = _urlparse(original)
+                    orig_path = orig_parsed.path or "/"
+                    if orig_path not in seen_paths:
+                        seen_paths.add(orig_path)
+                        diagnostics["sample_archived_paths"].append(orig_path)
+                        # Only 10 samples are reported; skip the remaining rows
+                        if len(seen_paths) >= 10:
+                            break
+                except Exception:
+                    continue
     except Exception:
         pass
 
@@ -211,43 +546,56 @@ async def get_domain_diagnostics(
     return diagnostics
 
 
-def get_url_variations(url: str, include_host_variants: bool = True) -> list[str]:
+@lru_cache(maxsize=1024)
+def get_url_variations(url: str, include_host_variants: bool = True) -> tuple[str, ...]:
     """Generate URL variations to try (e.g., with .html, trailing slash, www/non-www)."""
-    from urllib.parse import urlparse, urlunparse
-
     variations = [url]
+    seen = {url}
+
+    def add(variant: str) -> None:
+        if variant not in seen:
+            seen.add(variant)
+            variations.append(variant)
 
     # Add www/non-www variant
     if include_host_variants:
-        parsed = urlparse(url)
-        host = parsed.netloc
-        if host.startswith("www."):
-            alt_host = host[4:]
-        else:
-            alt_host = "www." + host
-        alt_parsed = parsed._replace(netloc=alt_host)
-        alt_url = urlunparse(alt_parsed)
-        if alt_url != url:
-            variations.append(alt_url)
+        host = _urlparse(url).netloc
+        if host:
+            alt_host = host[4:] if host.startswith("www.") else "www." + host
+            # The host is the first thing after the scheme, so a plain string
+            # replace is equivalent to a urlparse/urlunparse round trip
+            add(url.replace(host, alt_host, 1))
+
+    # Don't add path variations if URL is a directory or has a query string
+    # (trailing slash checked first: it is the more common shape)
+    if url.endswith("/") or "?" in url:
+        return tuple(variations)
+
+    # A bare host has no page name to suffix (example.com.html is never a capture)
+    path = _urlparse(url).path
+    if not path:
+        return tuple(variations)
+
+    # A file extension on the last path segment (.html, .pdf, .php, ...) means
+    # .html/.htm/slash variants would name a different, unlikely resource
+    _, dot, ext = path.rpartition("/")[2].rpartition(".")
+    if dot and ext.lower() in _FILE_EXTENSIONS:
+        return tuple(variations)
 
-    # Don't add path variations if URL already has a file extension or query string
-    if "?" in url or url.endswith("/"):
-        return variations
+    # Add common path variations for each host variant
+    for base_url in variations[:]:
+        for suffix in _VARIANT_SUFFIXES:
+            add(base_url + suffix)
 
-    # Check if URL already has a common extension
-    path = url.split("?")[0]
-    if path.endswith((".html", ".htm", ".php", ".asp", ".aspx", ".jsp")):
-        return variations
+    return tuple(variations)
 
-    # Add common path variations for each host variant
-    base_variations = list(variations)
-    for base_url in base_variations:
-        for suffix in [".html", ".htm", "/"]:
-            variant = base_url + suffix
-            if variant not in variations:
-                variations.append(variant)
 
-    return variations
+@lru_cache(maxsize=2048)
+def _prep(url: str) -> tuple[str, tuple[str, ...]]:
+    """Add a scheme to a tool's URL argument and return it with its variations."""
+    if not url.startswith(("http://", "https://")):
+        url = "https://" + url
+    return url, get_url_variations(url)
 
 
 # =============================================================================
@@ -291,80 +639,92 @@ async def get_archived_snapshot(
 ) -> str:
     # Validate date format
     try:
-        target_dt = datetime.strptime(target_date, "%Y-%m-%d")
+        target_dt = _parse_ymd(target_date)
     except ValueError:
         return f"Error: Invalid target_date format '{target_date}'. Please use YYYY-MM-DD format."
 
     # For backtesting: ensure we don't access snapshots after cutoff_date
     try:
-        cutoff_dt = datetime.strptime(cutoff_date, "%Y-%m-%d")
+        cutoff_dt = _parse_ymd(cutoff_date)
         if target_dt > cutoff_dt:
             target_date = cutoff_date
             target_dt = cutoff_dt
     except ValueError:
         pass  # If cutoff_date is invalid, proceed with original target_date
 
-    # Normalize URL
-    if not url.startswith(("http://", "https://")):
-        url = "https://" + url
-
-    # Try URL variations (original, .html, .htm, /) to find snapshots
-    url_variations = get_url_variations(url)
-    snapshot = None
+    # Normalize URL and try variations (original, .html, .htm, /) to find snapshots
+    url, url_variations = _prep(url)
     matched_url = url
 
-    # Use single client for all operations to avoid connection pool exhaustion
-    async with httpx.AsyncClient(timeout=60, follow_redirects=True) as client:
-        for url_variant in url_variations:
-            snapshot = await find_snapshot_before_date(client, url_variant, target_date)
-            if snapshot:
-                matched_url = url_variant
-                break
-
-        if not snapshot:
-            # Get diagnostics to provide helpful hints
-            diagnostics = await get_domain_diagnostics(client, url, cutoff_date=target_date)
-            tried = ", ".join(url_variations)
-
-            result = f"No archived snapshot found for '{url}' at or before {target_date}.\n\n"
-            result += f"**Tried URL variations:** {tried}\n\n"
-            result += f"**Reason:** {diagnostics['reason'].replace('_', ' ').title()}\n\n"
-
-            if diagnostics["hints"]:
-                result += "**Hints:**\n"
-                for hint in diagnostics["hints"]:
-                    result += f"- {hint}\n"
-
-            if diagnostics["sample_archived_paths"]:
-                result += f"\n**Archived paths on this domain (before {target_date}):**\n"
-                for path in diagnostics["sample_archived_paths"][:8]:
-                    result += f"- {path}\n"
-
-            return result
-
-        snapshot_timestamp = snapshot.get("timestamp", "")
-        snapshot_date = parse_wayback_timestamp(snapshot_timestamp)
-
-        archive_url = snapshot.get("url", "")
-        if not archive_url:
-            return f"Error: Could not retrieve archive URL for '{matched_url}'."
-
-        content = await fetch_archived_page(client, archive_url)
-
-    result = f"""## Archived Snapshot
-**Original URL:** {url}
-**Matched URL:** {matched_url}
-**Snapshot Date:** {snapshot_date}
-**Archive URL:** {archive_url}
-
----
-
-{content}"""
+    hit, snapshot = await _first_hit([
+        _snapshot_before_date(url_variant, target_date) for url_variant in url_variations
+    ], grace=VARIANT_GRACE_SECONDS)
+    if snapshot:
+        matched_url = url_variations[hit]
+
+    if not snapshot:
+        # Get diagnostics to provide helpful hints. They are only requested on a
+        # miss: cancelling a cached call does not stop its request, so starting
+        # them early would cost archive.org a domain-wide query on every hit.
+        diagnostics = await get_domain_diagnostics(url, cutoff_date=target_date)
+        tried = ", ".join(url_variations)
+
+        parts = [
+            f"No archived snapshot found for '{url}' at or before {target_date}.\n\n",
+            f"**Tried URL variations:** {tried}\n\n",
+            f"**Reason:** {diagnostics['reason'].replace('_', ' ').title()}\n\n",
+        ]
 
-    return result
+        if diagnostics["hints"]:
+            parts.append("**Hints:**\n")
+            parts.extend(f"- {hint}\n" for hint in diagnostics["hints"])
+
+        if diagnostics["sample_archived_paths"]:
+            parts.append(f"\n**Archived paths on this domain (before {target_date}):**\n")
+            parts.extend(f"- {path}\n" for path in diagnostics["sample_archived_paths"][:8])
+
+        return "".join(parts)
+
+    snapshot_timestamp = snapshot.get("timestamp", "")
+    snapshot_date = parse_wayback_timestamp(snapshot_timestamp)
+
+    archive_url = snapshot.get("url", "")
+    if not archive_url:
+        return f"Error: Could not retrieve archive URL for '{matched_url}'."
+
+    content = await fetch_archived_page(archive_url)
+
+    # Join the header and content in one pass; content can be the bulk of the result
+    return "".join((
+        "## Archived Snapshot\n**Original URL:** ", url,
+        "\n**Matched URL:** ", matched_url,
+        "\n**Snapshot Date:** ", snapshot_date,
+        "\n**Archive URL:** ", archive_url,
+        "\n\n---\n\n", content,
+    ))
+
+
+def _pick_periodic(snapshots: list[Snapshot], keylen: int, limit: int | None = None) -> list[Snapshot]:
+    """Keep the first snapshot of each period, where the period is date[:keylen].
+
+    Snapshots arrive time-sorted, so equal keys are adjacent and only the last
+    key needs tracking. Stops as soon as limit picks have been collected.
+    """
+    picked = []
+    last = None
+    for s in snapshots:
+        key = s.date[:keylen]
+        if key != last:
+            picked.append(s)
+            last = key
+            if limit is not None and len(picked) >= limit:
+                break
+    return picked
 
 
-def apply_pick_filter(snapshots: list[dict], pick: str, target_date: str | None = None) -> list[dict]:
+def apply_pick_filter(
+    snapshots: list[Snapshot], pick: str, target_date: str | None = None, limit: int | None = None
+) -> list[Snapshot]:
     """Apply snapshot selection filter based on pick parameter."""
     if not snapshots or not pick:
         return snapshots
@@ -380,36 +740,22 @@ def apply_pick_filter(snapshots: list[dict], pick: str, target_date: str | None
     elif pick == "closest_to_date" and target_date:
         # Return single snapshot closest to specified date
         try:
-            target_dt = datetime.strptime(target_date, "%Y-%m-%d")
+            target_day = date.fromisoformat(target_date).toordinal()
             closest = min(
                 snapshots,
-                key=lambda s: abs((datetime.strptime(s["date"], "%Y-%m-%d") - target_dt).days)
+                key=lambda s: abs(date.fromisoformat(s.date).toordinal() - target_day)
             )
             return [closest]
-        except (ValueError, KeyError):
+        except ValueError:
             return snapshots[:1]
 
     elif pick == "monthly":
         # Return one snapshot per month
-        seen_months = set()
-        monthly = []
-        for s in snapshots:
-            month_key = s["date"][:7]  # YYYY-MM
-            if month_key not in seen_months:
-                seen_months.add(month_key)
-                monthly.append(s)
-        return monthly
+        return _pick_periodic(snapshots, 7, limit)  # YYYY-MM
 
     elif pick == "yearly":
         # Return one snapshot per year
-        seen_years = set()
-        yearly = []
-        for s in snapshots:
-            year_key = s["date"][:4]  # YYYY
-            if year_key not in seen_years:
-                seen_years.add(year_key)
-                yearly.append(s)
-        return yearly
+        return _pick_periodic(snapshots, 4, limit)  # YYYY
 
     return snapshots
 
@@ -468,7 +814,7 @@ async def list_available_snapshots(
     cutoff_dt = None
     if cutoff_date:
         try:
-            cutoff_dt = datetime.strptime(cutoff_date, "%Y-%m-%d")
+            cutoff_dt = _parse_ymd(cutoff_date)
         except ValueError:
             pass
 
@@ -483,101 +829,95 @@ async def list_available_snapshots(
                 continue
             years_queried.append(year)
 
-        # Normalize URL
-        if not url.startswith(("http://", "https://")):
-            url = "https://" + url
-
-        url_variations = get_url_variations(url)
+        url, url_variations = _prep(url)
         matched_url = url
 
-        async with httpx.AsyncClient(timeout=30) as client:
-            for year in years_queried:
-                year_start = f"{year}-01-01"
-                year_end = f"{year}-12-31"
-
-                # Cap year_end at cutoff_date
-                if cutoff_dt and year == cutoff_dt.year:
-                    year_end = cutoff_date
-
-                for url_variant in url_variations:
-                    params = {
-                        "url": url_variant,
-                        "output": "json",
-                        "fl": "timestamp,original,statuscode",
-                        "filter": "statuscode:200",
-                        "collapse": "timestamp:8",
-                        "limit": 20,
-                        "sort": "reverse",
-                        "from": year_start.replace("-", ""),
-                        "to": year_end.replace("-", ""),
-                    }
-
-                    try:
-                        resp = await client.get(WAYBACK_CDX_API, params=params)
-                        resp.raise_for_status()
-                        data = resp.json()
-                        if len(data) > 1:
-                            matched_url = url_variant
-                            headers = data[0]
-                            for row in data[1:]:
-                                row_dict = dict(zip(headers, row))
-                                timestamp = row_dict.get("timestamp", "")
-                                snapshot_date = parse_wayback_timestamp(timestamp)
-
-                                # Extra safety: filter by cutoff
-                                if cutoff_dt:
-                                    try:
-                                        snap_dt = datetime.strptime(snapshot_date, "%Y-%m-%d")
-                                        if snap_dt > cutoff_dt:
-                                            continue
-                                    except ValueError:
-                                        pass
-
-                                archive_url = f"{WAYBACK_BASE_URL}/{timestamp}/{row_dict.get('original', matched_url)}"
-                                all_snapshots.append({
-                                    "date": snapshot_date,
-                                    "timestamp": timestamp,
-                                    "archive_url": archive_url,
-                                    "year": year,
-                                })
-                            break
-                    except Exception:
-                        continue
-
-            if not all_snapshots:
-                diagnostics = await get_domain_diagnostics(client, url, cutoff_date=cutoff_date)
-                return json.dumps({
-                    "url": url,
-                    "years_queried": years_queried,
-                    "snapshots": [],
-                    "diagnostics": diagnostics,
-                }, indent=2)
+        # Shared by every year and variant; only url/from/to vary
+        base_params = {
+            "output": "json",
+            "fl": "timestamp,original,statuscode",
+            "filter": "statuscode:200",
+            "collapse": "timestamp:8",
+            "limit": 20,
+            "sort": "reverse",
+        }
+
+        async def query_year(year: int) -> tuple[int | None, list | None]:
+            year_end = f"{year}1231"
+
+            # Cap year_end at cutoff_date
+            if cutoff_dt and year == cutoff_dt.year:
+                year_end = cutoff_date.replace("-", "")
+
+            year_params = {**base_params, "from": f"{year}0101", "to": year_end}
+            return await _first_hit([
+                _query_cdx({**year_params, "url": url_variant}, HTTP_TIMEOUTS["cdx"])
+                for url_variant in url_variations
+            ], grace=VARIANT_GRACE_SECONDS)
+
+        # Query all years concurrently, then assemble in year order
+        year_results = await asyncio.gather(*(query_year(year) for year in years_queried))
+
+        for year, (hit, data) in zip(years_queried, year_results):
+            if not data:
+                continue
+
+            matched_url = url_variations[hit]
+            # Columns arrive in the order requested by fl (header row skipped)
+            for timestamp, original, _status in data[1:]:
+                snapshot_date = parse_wayback_timestamp(timestamp)
+
+                # Extra safety: to= already bounds rows by cutoff
+                if cutoff_dt and snapshot_date > cutoff_date:
+                    continue
+
+                archive_url = f"{WAYBACK_BASE_URL}/{timestamp}/{original or matched_url}"
+                all_snapshots.append(Snapshot(snapshot_date, timestamp, archive_url, year))
+
+        if not all_snapshots:
+            diagnostics = await get_domain_diagnostics(url, cutoff_date=cutoff_date)
+            return _dump_json({
+                "url": url,
+                "years_queried": years_queried,
+                "snapshots": [],
+                "diagnostics": diagnostics,
+            })
 
         # Apply pick filter
-        all_snapshots = apply_pick_filter(all_snapshots, pick, target_date)
+        all_snapshots = [s._asdict() for s in apply_pick_filter(all_snapshots, pick, target_date)]
 
         # Group by year for output
         by_year = {}
         for s in all_snapshots:
-            yr = s.get("year", s["date"][:4])
+            yr = s["year"]
             if yr not in by_year:
                 by_year[yr] = []
             by_year[yr].append(s)
 
-        return json.dumps({
+        return _dump_json({
             "url": url,
             "matched_url": matched_url,
             "years_queried": years_queried,
             "total_found": len(all_snapshots),
             "snapshots_by_year": by_year,
             "snapshots": all_snapshots[:limit],
-        }, indent=2)
+        })
 
     # Standard single-range query
+    # Dates are compared as strings and sent to CDX as from=/to=, so anything
+    # but YYYY-MM-DD (e.g. "2023", which CDX pads to the end of the year)
+    # would slip past the cutoff cap
+    for name, value in (("start_date", start_date), ("end_date", end_date)):
+        if value:
+            try:
+                _parse_ymd(value)
+            except ValueError:
+                return f"Error: Invalid {name} format '{value}'. Please use YYYY-MM-DD format."
+
     # For backtesting: cap end_date at cutoff_date to prevent leakage
     effective_end_date = end_date
     if cutoff_date:
-        if end_date is None:
+        if not end_date:
             effective_end_date = cutoff_date
         else:
             effective_end_date = min(end_date, cutoff_date)
@@ -587,83 +927,70 @@ async def list_available_snapshots(
     if target_date and cutoff_date and target_date > cutoff_date:
         effective_target_date = cutoff_date
 
-    # Normalize URL
-    if not url.startswith(("http://", "https://")):
-        url = "https://" + url
-
-    # Try URL variations to find snapshots
-    url_variations = get_url_variations(url)
-    data = None
+    # Normalize URL and try variations to find snapshots
+    url, url_variations = _prep(url)
     matched_url = url
 
-    async with httpx.AsyncClient(timeout=30) as client:
-        for url_variant in url_variations:
-            params = {
-                "url": url_variant,
-                "output": "json",
-                "fl": "timestamp,original,statuscode",
-                "filter": "statuscode:200",
-                "collapse": "timestamp:8",
-                "limit": limit * 2,
-                "sort": "reverse",
-            }
-            if start_date:
-                params["from"] = start_date.replace("-", "")
-            if effective_end_date:
-                params["to"] = effective_end_date.replace("-", "")
-
-            try:
-                resp = await client.get(WAYBACK_CDX_API, params=params)
-                resp.raise_for_status()
-
-                variant_data = resp.json()
-                if len(variant_data) > 1:  # Has results (first row is header)
-                    data = variant_data
-                    matched_url = url_variant
-                    break
-            except (httpx.HTTPError, json.JSONDecodeError):
-                continue
+    # CDX can pick the snapshot closest to a date itself, returning one row
+    closest = pick == "closest_to_date" and effective_target_date
 
-        if not data or len(data) <= 1:
-            # Get diagnostics for helpful error message
-            diagnostics = await get_domain_diagnostics(client, url, cutoff_date=effective_end_date)
-            return json.dumps({
-                "url": url,
-                "tried_variations": url_variations,
-                "snapshots": [],
-                "diagnostics": diagnostics,
-            }, indent=2)
+    # Everything but the URL is the same for every variant
+    base_params = {
+        "output": "json",
+        "fl": "timestamp,original,statuscode",
+        "filter": "statuscode:200",
+    }
+    if closest:
+        base_params["closest"] = effective_target_date.replace("-", "")
+        base_params["sort"] = "closest"
+        base_params["limit"] = 1
+    else:
+        base_params["collapse"] = "timestamp:8"
+        base_params["limit"] = limit * 2
+        base_params["sort"] = "reverse"
+    if start_date:
+        base_params["from"] = start_date.replace("-", "")
+    if effective_end_date:
+        base_params["to"] = effective_end_date.replace("-", "")
+
+    hit, data = await _first_hit([
+        _query_cdx({**base_params, "url": url_variant}, HTTP_TIMEOUTS["cdx"]) for url_variant in url_variations
+    ], grace=VARIANT_GRACE_SECONDS)
+    if data:
+        matched_url = url_variations[hit]
+
+    if not data or len(data) <= 1:
+        # Get diagnostics for helpful error message
+        diagnostics = await get_domain_diagnostics(url, cutoff_date=effective_end_date)
+        return _dump_json({
+            "url": url,
+            "tried_variations": url_variations,
+            "snapshots": [],
+            "diagnostics": diagnostics,
+        })
 
-    headers = data[0]
     snapshots = []
 
-    for row in data[1:limit * 2]:
-        row_dict = dict(zip(headers, row))
-        timestamp = row_dict.get("timestamp", "")
+    # Columns arrive in the order requested by fl (header row skipped)
+    for timestamp, original, _status in data[1:limit * 2]:
         snapshot_date = parse_wayback_timestamp(timestamp)
 
-        # Filter out snapshots after cutoff_date (extra safety)
-        if cutoff_dt:
-            try:
-                snapshot_dt = datetime.strptime(snapshot_date, "%Y-%m-%d")
-                if snapshot_dt > cutoff_dt:
-                    continue
-            except ValueError:
-                pass
-
-        archive_url = f"{WAYBACK_BASE_URL}/{timestamp}/{row_dict.get('original', matched_url)}"
+        # Extra safety: to= already bounds rows by cutoff
+        if cutoff_dt and snapshot_date > cutoff_date:
+            continue
 
-        snapshots.append({
-            "date": snapshot_date,
-            "timestamp": timestamp,
-            "archive_url": archive_url,
-        })
+        archive_url = f"{WAYBACK_BASE_URL}/{timestamp}/{original or matched_url}"
+        snapshots.append(Snapshot(snapshot_date, timestamp, archive_url))
 
-    # Apply pick filter
-    snapshots = apply_pick_filter(snapshots, pick, effective_target_date)
+    # Apply pick filter (closest_to_date was already applied by CDX)
+    if not closest:
+        snapshots = apply_pick_filter(snapshots, pick, effective_target_date, limit)
 
-    # Limit final output
-    snapshots = snapshots[:limit]
+    # Limit final output (no year in single-range results)
+    snapshots = [
+        {"date": s.date, "timestamp": s.timestamp, "archive_url": s.archive_url}
+        for s in snapshots[:limit]
+    ]
 
     result = {
         "url": url,
@@ -676,7 +1003,7 @@ async def list_available_snapshots(
         "snapshots": snapshots,
     }
 
-    return json.dumps(result, indent=2)
+    return _dump_json(result)
 
 
 @mcp.tool(
@@ -716,22 +1043,12 @@ async def search_site_archives(
     limit: Annotated[int, "Maximum number of unique paths to return (default 30, max 100)"] = 30,
     cutoff_date: Annotated[str, "Cutoff date for backtesting (hidden from LLM)"] = None,
 ) -> str:
-    from urllib.parse import urlparse
-
     # Validate and cap limit
     limit = min(max(1, limit), 100)
 
-    # Parse cutoff date
-    cutoff_dt = None
-    if cutoff_date:
-        try:
-            cutoff_dt = datetime.strptime(cutoff_date, "%Y-%m-%d")
-        except ValueError:
-            pass
-
     # Clean domain (remove protocol if present)
     if domain.startswith(("http://", "https://")):
-        parsed = urlparse(domain)
+        parsed = _urlparse(domain)
         domain = parsed.netloc
 
     # Build search URL pattern
@@ -754,84 +1071,75 @@ async def search_site_archives(
 
     all_results = []
     seen_paths = set()
+    # CDX urlkeys are canonical (no scheme or www.), so rows repeated by the
+    # second host variant can be skipped before any URL parsing
+    seen_urlkeys = set()
+
+    def domain_params(d: str) -> dict:
+        if path_pattern:
+            pattern = path_pattern if path_pattern.startswith("/") else path_pattern
+            query_url = f"{d}{pattern}" if pattern.startswith("/") else f"{d}/*{pattern}*"
+        else:
+            query_url = f"{d}/*"
+
+        params = {
+            "url": query_url,
+            "output": "json",
+            "fl": "original,timestamp,statuscode,urlkey",
+            "filter": "statuscode:200",
+            "collapse": "urlkey",  # One result per unique URL
+            "limit": limit * 3,  # Get extra to account for filtering
+        }
+
+        # Add date filter for cutoff
+        if cutoff_date:
+            params["to"] = cutoff_date.replace("-", "")
+        return params
+
+    # Query all host variants concurrently, then merge in order
+    responses = await asyncio.gather(*(
+        _query_cdx(domain_params(d), HTTP_TIMEOUTS["search"]) for d in domains_to_try
+    ))
+
+    for data in responses:
+        if not data:
+            continue
+
+        # Columns arrive in the order requested by fl (header row skipped)
+        for original, timestamp, _status, urlkey in data[1:]:
+            if urlkey in seen_urlkeys:
+                continue
+            seen_urlkeys.add(urlkey)
 
-    async with httpx.AsyncClient(timeout=30) as client:
-        for d in domains_to_try:
-            if path_pattern:
-                pattern = path_pattern if path_pattern.startswith("/") else path_pattern
-                query_url = f"{d}{pattern}" if pattern.startswith("/") else f"{d}/*{pattern}*"
-            else:
-                query_url = f"{d}/*"
-
-            params = {
-                "url": query_url,
-                "output": "json",
-                "fl": "original,timestamp,statuscode",
-                "filter": "statuscode:200",
-                "collapse": "urlkey",  # One result per unique URL
-                "limit": limit * 3,  # Get extra to account for filtering
-            }
-
-            # Add date filter for cutoff
-            if cutoff_date:
-                params["to"] = cutoff_date.replace("-", "")
-
-            try:
-                resp = await client.get(WAYBACK_CDX_API, params=params, timeout=20)
-                if resp.status_code != 200:
-                    continue
-
-                data = resp.json()
-                if len(data) <= 1:
-                    continue
+            snapshot_date = parse_wayback_timestamp(timestamp)
 
-                headers = data[0]
-                for row in data[1:]:
-                    row_dict = dict(zip(headers, row))
-                    original = row_dict.get("original", "")
-                    timestamp = row_dict.get("timestamp", "")
-                    snapshot_date = parse_wayback_timestamp(timestamp)
-
-                    # Extra safety: filter by cutoff date
-                    if cutoff_dt:
-                        try:
-                            snap_dt = datetime.strptime(snapshot_date, "%Y-%m-%d")
-                            if snap_dt > cutoff_dt:
-                                continue
-                        except ValueError:
-                            pass
-
-                    # Extract path
-                    try:
-                        orig_parsed = urlparse(original)
-                        path = orig_parsed.path or "/"
-                        host = orig_parsed.netloc
-
-                        # Deduplicate by path (ignore host variations)
-                        path_key = path.lower().rstrip("/") or "/"
-                        if path_key in seen_paths:
-                            continue
-                        seen_paths.add(path_key)
-
-                        archive_url = f"{WAYBACK_BASE_URL}/{timestamp}/{original}"
-                        all_results.append({
-                            "path": path,
-                            "full_url": original,
-                            "host": host,
-                            "last_captured": snapshot_date,
-                            "archive_url": archive_url,
-                        })
-
-                        if len(all_results) >= limit:
-                            break
-                    except Exception:
-                        continue
+            # Extra safety: to= already bounds rows by cutoff
+            if cutoff_date and snapshot_date > cutoff_date:
+                continue
 
-                if len(all_results) >= limit:
-                    break
+            # Extract path
+            host, path = _split_http(original)
 
-            except Exception:
+            # Deduplicate by path (ignore host variations)
+            path_key = path.lower().rstrip("/") or "/"
+            if path_key in seen_paths:
                 continue
+            seen_paths.add(path_key)
+
+            archive_url = f"{WAYBACK_BASE_URL}/{timestamp}/{original}"
+            all_results.append({
+                "path": path,
+                "full_url": original,
+                "host": host,
+                "last_captured": snapshot_date,
+                "archive_url": archive_url,
+            })
+
+            if len(all_results) >= limit:
+                break
+
+        if len(all_results) >= limit:
+            break
 
     # Sort by path for easier reading
     all_results.sort(key=lambda x: x["path"])
@@ -855,7 +1163,7 @@ async def search_site_archives(
             "The site may not be well-archived in the Wayback Machine",
         ]
 
-    return json.dumps(result, indent=2)
+    return _dump_json(result)
 
 
 if __name__ == "__main__":
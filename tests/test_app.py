@@ -0,0 +1,18 @@
+from fastmcp.server.auth import AccessToken
+
+from app import _StaticTokenAuth
+
+
+class TestStaticTokenAuth:
+    """Tests for the MCP_AUTH_TOKEN bearer token check."""
+
+    async def test_matching_token_is_accepted(self):
+        access = await _StaticTokenAuth("s3cret-token").verify_token("s3cret-token")
+        assert isinstance(access, AccessToken)
+        assert access.token == "s3cret-token"
+
+    async def test_wrong_token_is_rejected(self):
+        assert await _StaticTokenAuth("s3cret-token").verify_token("s3cret-tokem") is None
+
+    async def test_token_of_other_length_is_rejected(self):
+        assert await _StaticTokenAuth("s3cret-token").verify_token("s3cret") is None
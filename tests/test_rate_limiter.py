@@ -0,0 +1,143 @@
+import asyncio
+import inspect
+import json
+import os
+
+import pytest
+
+from rate_limiter import RateLimiter, RateLimitTimeout, rate_limited
+
+
+def make_limiter(tmp_path, **config) -> RateLimiter:
+    config_path = tmp_path / "rate_limits.json"
+    config_path.write_text(json.dumps({"max_requests_per_second": 2, "max_wait_seconds": 5, "tools": {}, **config}))
+    return RateLimiter(str(config_path))
+
+
+class TestRateLimiter:
+    """Tests for the asyncio rate limiter."""
+
+    async def test_first_acquire_does_not_wait(self, tmp_path):
+        limiter = make_limiter(tmp_path)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await limiter.acquire("tool")
+        assert loop.time() - start < 0.1
+
+    async def test_acquire_over_limit_waits(self, tmp_path):
+        limiter = make_limiter(tmp_path)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await asyncio.gather(*(limiter.acquire("tool") for _ in range(3)))
+        assert loop.time() - start >= 0.4
+
+    async def test_no_one_second_window_exceeds_limit(self, tmp_path):
+        limit = 5
+        limiter = make_limiter(tmp_path, max_requests_per_second=limit)
+        loop = asyncio.get_running_loop()
+        admitted = []
+
+        async def call():
+            await limiter.acquire("tool")
+            admitted.append(loop.time())
+
+        await asyncio.gather(*(call() for _ in range(2 * limit)))
+        # The (N+1)th admission is a full second after the first, in every window
+        assert all(
+            later - earlier >= 0.99 for earlier, later in zip(admitted, admitted[limit:])
+        )
+
+    async def test_acquire_times_out(self, tmp_path):
+        limiter = make_limiter(tmp_path, max_requests_per_second=1, max_wait_seconds=0.2)
+        await limiter.acquire("tool")
+        with pytest.raises(RateLimitTimeout):
+            await limiter.acquire("tool")
+
+    async def test_acquire_is_fifo(self, tmp_path):
+        limiter = make_limiter(tmp_path, max_requests_per_second=10)
+        order = []
+
+        async def call(i):
+            await limiter.acquire("tool")
+            order.append(i)
+
+        await asyncio.gather(*(call(i) for i in range(15)))
+        assert order == list(range(15))
+
+    async def test_per_tool_limit(self, tmp_path):
+        limiter = make_limiter(
+            tmp_path,
+            max_requests_per_second=100,
+            max_wait_seconds=0.2,
+            tools={"slow": {"max_requests_per_second": 1}},
+        )
+        await limiter.acquire("slow")
+        await limiter.acquire("fast")
+        with pytest.raises(RateLimitTimeout):
+            await limiter.acquire("slow")
+
+    async def test_idle_tools_are_dropped(self, tmp_path):
+        limiter = make_limiter(tmp_path, max_requests_per_second=100, tools={"configured": {}})
+        await limiter.acquire("transient")
+        assert "transient" in limiter._tool_next
+        await asyncio.sleep(0.05)
+        limiter.get_status()
+        assert "transient" not in limiter._tool_next
+        assert "configured" in limiter._tool_next
+
+    async def test_rate_limited_keeps_coroutine_functions_async(self, tmp_path):
+        limiter = make_limiter(tmp_path)
+
+        @rate_limited(limiter)
+        async def tool(x):
+            return x * 2
+
+        assert inspect.iscoroutinefunction(tool)
+        assert await tool(21) == 42
+        assert "tool" in limiter.get_status()["tool_delays"]
+
+    def test_rate_limited_sync_function(self, tmp_path):
+        limiter = make_limiter(tmp_path)
+
+        @rate_limited(limiter)
+        def tool(x):
+            return x + 1
+
+        assert tool(1) == 2
+        assert "tool" in limiter.get_status()["tool_delays"]
+
+
+class TestConfigLoading:
+    """Tests for rate limit config loading."""
+
+    def test_missing_config_uses_defaults(self, tmp_path):
+        limiter = RateLimiter(str(tmp_path / "missing.json"))
+        assert limiter.config["max_requests_per_second"] == 10
+
+    @pytest.mark.parametrize("config", [
+        {"max_requests_per_second": 0},
+        {"tools": {"slow": {"max_requests_per_second": -1}}},
+    ])
+    def test_non_positive_limit_is_rejected(self, tmp_path, config):
+        with pytest.raises(ValueError, match="must be positive"):
+            make_limiter(tmp_path, **config)
+
+    def test_unchanged_config_is_parsed_once(self, tmp_path, monkeypatch):
+        first = make_limiter(tmp_path)
+        monkeypatch.setattr("rate_limiter.orjson.loads", None)
+        second = RateLimiter(str(tmp_path / "rate_limits.json"))
+        assert second.config == first.config
+
+    def test_limiters_do_not_share_config(self, tmp_path):
+        first = make_limiter(tmp_path, tools={"slow": {"max_requests_per_second": 1}})
+        first.config["tools"]["slow"]["max_requests_per_second"] = 50
+        second = RateLimiter(str(tmp_path / "rate_limits.json"))
+        assert second.config["tools"]["slow"]["max_requests_per_second"] == 1
+
+    def test_modified_config_is_reloaded(self, tmp_path):
+        make_limiter(tmp_path)
+        config_path = tmp_path / "rate_limits.json"
+        config_path.write_text(json.dumps({"max_requests_per_second": 7, "tools": {}}))
+        stat = config_path.stat()
+        os.utime(config_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+        assert RateLimiter(str(config_path)).config["max_requests_per_second"] == 7
@@ -1,7 +1,13 @@
+import asyncio
 import inspect
+from datetime import date
+from urllib.parse import urlparse
 
+import httpx
+import orjson
 import pytest
 
+import server
 from server import (
     get_archived_snapshot,
     list_available_snapshots,
@@ -10,9 +16,52 @@ from server import (
     parse_wayback_timestamp,
     get_url_variations,
     apply_pick_filter,
+    Snapshot,
 )
 
 
+def snap(day: str) -> Snapshot:
+    return Snapshot(day, day.replace("-", "") + "000000", "")
+
+
+class MockArchive:
+    """Stand-in for web.archive.org: records requests and answers them with handler."""
+
+    def __init__(self):
+        self.requests = []
+        self.handler = lambda request: httpx.Response(404)
+
+    def __call__(self, request):
+        self.requests.append(request)
+        return self.handler(request)
+
+
+_CACHED_CALLS = (
+    server.find_snapshot_before_date,
+    server._query_cdx_cached,
+    server.fetch_archived_page,
+)
+
+
+@pytest.fixture
+async def archive(monkeypatch):
+    """Route the shared HTTP client to a MockArchive, with empty caches on both sides."""
+    mock = MockArchive()
+    client = httpx.AsyncClient(transport=httpx.MockTransport(mock))
+    monkeypatch.setattr(server, "_client", client)
+    monkeypatch.setattr(server, "_known_snapshots", {})
+    # A semaphore binds to the first event loop that waits on it; each test has its own
+    monkeypatch.setattr(server, "_cdx_slots", asyncio.Semaphore(server.CDX_MAX_CONCURRENCY))
+    # Retry immediately so transient-failure tests do not sleep through the backoff
+    monkeypatch.setattr(server, "_backoff", lambda retry_state: 0)
+    for cached in _CACHED_CALLS:
+        cached.cache_clear()
+    yield mock
+    await client.aclose()
+    for cached in _CACHED_CALLS:
+        cached.cache_clear()
+
+
 class TestBacktestToolConfiguration:
     """Tests for backtesting tool configuration - ALL tools should support backtesting."""
 
@@ -87,6 +136,24 @@ class TestHelperFunctions:
         result = parse_wayback_timestamp("2024")
         assert result == "2024"  # Returns as-is if too short
 
+    def test_parse_ymd(self):
+        assert server._parse_ymd("2024-01-15") == date(2024, 1, 15)
+
+    @pytest.mark.parametrize("value", ["20240115", "2024-1-15", "2024-02-30", "2024-W03-1"])
+    def test_parse_ymd_rejects_other_shapes(self, value):
+        with pytest.raises(ValueError):
+            server._parse_ymd(value)
+
+    @pytest.mark.parametrize("url", [
+        "https://example.com/blog/post?x=1#top",
+        "http://www.example.com/Team/",
+        "https://example.com",
+        "https://example.com?q=1",
+    ])
+    def test_split_http_matches_urlparse(self, url):
+        parsed = urlparse(url)
+        assert server._split_http(url) == (parsed.netloc, parsed.path or "/")
+
     def test_get_url_variations_includes_www(self):
         variations = get_url_variations("https://example.com/page")
         assert "https://www.example.com/page" in variations
@@ -106,64 +173,137 @@ class TestHelperFunctions:
         # Should not add .html again
         assert "https://example.com/page.html.html" not in variations
 
+    def test_get_url_variations_bare_host_only_varies_host(self):
+        variations = get_url_variations("https://example.com")
+        assert variations == ("https://example.com", "https://www.example.com")
+
+    def test_get_url_variations_skips_suffixes_for_any_extension(self):
+        variations = get_url_variations("https://example.com/files/report.pdf")
+        assert variations == ("https://example.com/files/report.pdf", "https://www.example.com/files/report.pdf")
+
+    @pytest.mark.parametrize("url", ["https://example.com/people/john.doe", "https://example.com/docs/v2.10"])
+    def test_get_url_variations_suffixes_dotted_names(self, url):
+        variations = get_url_variations(url)
+        assert url + ".html" in variations
+        assert url + "/" in variations
+
     def test_apply_pick_filter_closest_to_end(self):
         snapshots = [
-            {"date": "2024-03-01"},
-            {"date": "2024-02-01"},
-            {"date": "2024-01-01"},
+            snap("2024-03-01"),
+            snap("2024-02-01"),
+            snap("2024-01-01"),
         ]
         result = apply_pick_filter(snapshots, "closest_to_end")
         assert len(result) == 1
-        assert result[0]["date"] == "2024-03-01"
+        assert result[0].date == "2024-03-01"
 
     def test_apply_pick_filter_closest_to_start(self):
         snapshots = [
-            {"date": "2024-03-01"},
-            {"date": "2024-02-01"},
-            {"date": "2024-01-01"},
+            snap("2024-03-01"),
+            snap("2024-02-01"),
+            snap("2024-01-01"),
         ]
         result = apply_pick_filter(snapshots, "closest_to_start")
         assert len(result) == 1
-        assert result[0]["date"] == "2024-01-01"
+        assert result[0].date == "2024-01-01"
 
     def test_apply_pick_filter_monthly(self):
         snapshots = [
-            {"date": "2024-03-15"},
-            {"date": "2024-03-01"},
-            {"date": "2024-02-15"},
-            {"date": "2024-02-01"},
-            {"date": "2024-01-15"},
+            snap("2024-03-15"),
+            snap("2024-03-01"),
+            snap("2024-02-15"),
+            snap("2024-02-01"),
+            snap("2024-01-15"),
         ]
         result = apply_pick_filter(snapshots, "monthly")
         assert len(result) == 3
-        months = [s["date"][:7] for s in result]
+        months = [s.date[:7] for s in result]
         assert "2024-03" in months
         assert "2024-02" in months
         assert "2024-01" in months
 
     def test_apply_pick_filter_yearly(self):
         snapshots = [
-            {"date": "2024-06-15"},
-            {"date": "2024-01-15"},
-            {"date": "2023-06-15"},
-            {"date": "2022-06-15"},
+            snap("2024-06-15"),
+            snap("2024-01-15"),
+            snap("2023-06-15"),
+            snap("2022-06-15"),
         ]
         result = apply_pick_filter(snapshots, "yearly")
         assert len(result) == 3
-        years = [s["date"][:4] for s in result]
+        years = [s.date[:4] for s in result]
         assert "2024" in years
         assert "2023" in years
         assert "2022" in years
 
+    def test_apply_pick_filter_monthly_stops_at_limit(self):
+        snapshots = [
+            snap("2024-03-15"),
+            snap("2024-02-15"),
+            snap("2024-01-15"),
+        ]
+        result = apply_pick_filter(snapshots, "monthly", limit=2)
+        assert [s.date for s in result] == ["2024-03-15", "2024-02-15"]
+
     def test_apply_pick_filter_closest_to_date(self):
         snapshots = [
-            {"date": "2024-03-01"},
-            {"date": "2024-02-01"},
-            {"date": "2024-01-01"},
+            snap("2024-03-01"),
+            snap("2024-02-01"),
+            snap("2024-01-01"),
         ]
         result = apply_pick_filter(snapshots, "closest_to_date", "2024-02-15")
         assert len(result) == 1
-        assert result[0]["date"] == "2024-02-01"
+        assert result[0].date == "2024-02-01"
+
+
+class TestFirstHit:
+    """Tests for concurrent variant probing."""
+
+    async def test_prefers_earliest_position_not_fastest(self):
+        async def lookup(value, delay):
+            await asyncio.sleep(delay)
+            return value
+
+        hit, result = await server._first_hit([lookup(None, 0.02), lookup("slow", 0.05), lookup("fast", 0.0)])
+        assert (hit, result) == (1, "slow")
+
+    async def test_cancels_lookups_after_hit(self):
+        finished = []
+
+        async def lookup(value, delay):
+            await asyncio.sleep(delay)
+            finished.append(value)
+            return value
+
+        hit, result = await server._first_hit([lookup("first", 0.0), lookup("second", 0.05)])
+        await asyncio.sleep(0.1)
+        assert (hit, result) == (0, "first")
+        assert finished == ["first"]
+
+    async def test_grace_returns_later_hit_when_earlier_is_slow(self):
+        async def lookup(value, delay):
+            await asyncio.sleep(delay)
+            return value
+
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        hit, result = await server._first_hit([lookup("original", 0.5), lookup("variant", 0.0)], grace=0.02)
+        assert (hit, result) == (1, "variant")
+        assert loop.time() - start < 0.2
+
+    async def test_grace_prefers_earlier_hit_within_window(self):
+        async def lookup(value, delay):
+            await asyncio.sleep(delay)
+            return value
+
+        hit, result = await server._first_hit([lookup("original", 0.01), lookup("variant", 0.0)], grace=0.2)
+        assert (hit, result) == (0, "original")
+
+    async def test_no_hit(self):
+        async def miss():
+            return None
+
+        assert await server._first_hit([miss(), miss()]) == (None, None)
 
 
 class TestToolSchemas:
@@ -201,3 +341,200 @@ class TestToolSchemas:
         assert "domain" in required, "'domain' should be required"
         assert "path_pattern" in props, "Missing 'path_pattern' parameter"
         assert "limit" in props, "Missing 'limit' parameter"
+
+
+class TestSnapshotLookupCaching:
+    """Tests for CDX lookup caching and request coalescing."""
+
+    @pytest.fixture
+    def cdx_requests(self, archive):
+        archive.handler = lambda request: httpx.Response(200, json=[
+            ["timestamp", "original", "statuscode"],
+            ["20240115123456", "https://example.com/", "200"],
+        ])
+        return archive.requests
+
+    async def test_concurrent_identical_lookups_share_one_request(self, cdx_requests):
+        results = await asyncio.gather(*(
+            server.find_snapshot_before_date("https://example.com/", "2024-02-01") for _ in range(5)
+        ))
+        assert len(cdx_requests) == 1
+        assert all(r == results[0] for r in results)
+        assert results[0]["url"] == "https://web.archive.org/web/20240115123456/https://example.com/"
+
+    async def test_repeated_lookup_is_served_from_cache(self, cdx_requests):
+        await server.find_snapshot_before_date("https://example.com/", "2024-02-01")
+        await server.find_snapshot_before_date("https://example.com/", "2024-02-01")
+        await server.find_snapshot_before_date("https://example.com/", "2024-03-01")
+        assert len(cdx_requests) == 2
+
+    async def test_lookup_answers_later_lookup_for_capture_day(self, cdx_requests):
+        snapshot = await server._snapshot_before_date("https://example.com/", "2024-02-01")
+        assert snapshot["timestamp"] == "20240115123456"
+        assert await server._snapshot_before_date("https://example.com/", "2024-01-15") == snapshot
+        assert len(cdx_requests) == 1
+
+    async def test_known_capture_expires(self, cdx_requests, monkeypatch):
+        monkeypatch.setattr(server, "_KNOWN_SNAPSHOTS_TTL", 0)
+        await server._snapshot_before_date("https://example.com/", "2024-02-01")
+        await server._snapshot_before_date("https://example.com/", "2024-01-15")
+        assert len(cdx_requests) == 2
+
+    async def test_hit_does_not_query_domain_diagnostics(self, cdx_requests):
+        result = await get_archived_snapshot.fn("example.com/", "2024-02-01", cutoff_date="2024-06-01")
+        assert "**Snapshot Date:** 2024-01-15" in result
+        assert not any(r.url.params.get("url", "").endswith("/*") for r in cdx_requests)
+
+    @pytest.mark.parametrize("body, content_type", [
+        (b"error: timed out", "text/plain"),
+        (b"<html><body>Bad gateway</body></html>", "text/html"),
+        (b'[["timestamp"', "application/json"),
+    ])
+    async def test_non_json_cdx_response_means_no_snapshot(self, archive, body, content_type):
+        archive.handler = lambda request: httpx.Response(200, content=body, headers={"content-type": content_type})
+        result = await get_archived_snapshot.fn("example.com/page", "2024-02-01", cutoff_date="2024-06-01")
+        assert result.startswith("No archived snapshot found")
+
+    async def test_non_json_cdx_response_is_retried_not_cached(self, archive):
+        bodies = iter([
+            (b"error: timed out", "text/plain"),
+            (b'[["timestamp","original","statuscode"],["20240115123456","https://example.com/","200"]]', "application/json"),
+        ])
+
+        def handler(request):
+            body, content_type = next(bodies)
+            return httpx.Response(200, content=body, headers={"content-type": content_type})
+
+        archive.handler = handler
+        snapshot = await server.find_snapshot_before_date("https://example.com/", "2024-02-01")
+        assert snapshot["timestamp"] == "20240115123456"
+        assert len(archive.requests) == 2
+
+    async def test_failed_cdx_queries_are_not_cached(self, archive):
+        statuses = iter([404, 200, 200])
+        archive.handler = lambda request: httpx.Response(next(statuses), json=[["timestamp", "original", "statuscode"]])
+        params = {"url": "https://example.com/", "output": "json"}
+        assert await server._query_cdx(params, 5) is None
+        assert await server._query_cdx(params, 5) is None
+        assert await server._query_cdx(params, 5) is None
+        # The 404 is not cached, so the next call queries again; the empty result is cached
+        assert len(archive.requests) == 2
+
+    async def test_throttled_cdx_query_is_retried(self, archive):
+        statuses = iter([429, 503, 200])
+        archive.handler = lambda request: httpx.Response(
+            next(statuses),
+            headers={"Retry-After": "0"},
+            json=[["timestamp", "original", "statuscode"], ["20240115123456", "https://example.com/", "200"]],
+        )
+        data = await server._query_cdx({"url": "https://example.com/", "output": "json"}, 5)
+        assert data[1][0] == "20240115123456"
+        assert len(archive.requests) == 3
+
+    async def test_long_retry_after_is_not_retried_early(self, archive):
+        archive.handler = lambda request: httpx.Response(429, headers={"Retry-After": "60"})
+        assert await server._query_cdx({"url": "https://example.com/", "output": "json"}, 5) is None
+        assert len(archive.requests) == 1
+
+
+class TestListSnapshots:
+    """Tests for snapshot listings."""
+
+    async def test_year_queries_are_bounded(self, archive):
+        in_flight = peak = 0
+
+        async def handler(request):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return httpx.Response(200, json=[["timestamp", "original", "statuscode"]])
+
+        archive.handler = handler
+        await list_available_snapshots.fn("example.com/page", years=list(range(2015, 2025)), cutoff_date="2024-12-31")
+        # 10 years x 8 URL variants plus the miss diagnostics, never more than the cap at once
+        assert len(archive.requests) == 81
+        assert peak == server.CDX_MAX_CONCURRENCY
+
+
+class TestDomainDiagnostics:
+    """Tests for miss-path domain diagnostics."""
+
+    async def test_failed_query_is_not_cached(self, archive):
+        statuses = iter([404, 200])
+        archive.handler = lambda request: httpx.Response(next(statuses), json=[
+            ["original", "timestamp"],
+            ["https://example.com/about", "20240115123456"],
+        ])
+        first = await server.get_domain_diagnostics("https://example.com/team")
+        assert first["reason"] == "domain_not_archived"
+        second = await server.get_domain_diagnostics("https://example.com/team")
+        assert second["reason"] == "path_not_archived"
+        assert second["sample_archived_paths"] == ["/about"]
+        assert len(archive.requests) == 2
+
+
+class TestFetchArchivedPage:
+    """Tests for archived page download and conversion."""
+
+    @pytest.fixture
+    def serve(self, archive):
+        def install(content: bytes, content_type: str):
+            archive.handler = lambda request: httpx.Response(200, content=content, headers={"content-type": content_type})
+
+        return install
+
+    async def test_html_is_converted_to_markdown(self, serve):
+        serve(b"<html><body><h1>Title</h1><script>x()</script><p>Body</p></body></html>", "text/html; charset=utf-8")
+        text = await server.fetch_archived_page("https://web.archive.org/web/2024/https://example.com/")
+        assert "# Title" in text
+        assert "Body" in text
+        assert "x()" not in text
+
+    async def test_non_html_content_is_skipped(self, serve):
+        serve(b"%PDF-1.7 binary", "application/pdf")
+        text = await server.fetch_archived_page("https://web.archive.org/web/2024/https://example.com/a.pdf")
+        assert "application/pdf" in text
+        assert "PDF-1.7" not in text
+
+    async def test_oversized_page_is_cut_at_a_tag_boundary(self, serve, monkeypatch):
+        monkeypatch.setattr(server, "MAX_PAGE_BYTES", 64)
+        serve(b"<p>" + "é".encode() * 20 + b"</p><p>" + "é".encode() * 40 + b"</p>", "text/html")
+        text = await server.fetch_archived_page("https://web.archive.org/web/2024/https://example.com/big")
+        assert "é" * 20 in text
+        assert "é" * 21 not in text
+        assert "\ufffd" not in text
+
+
+class TestCutoffEnforcement:
+    """Tests that results never leak past cutoff_date."""
+
+    @pytest.fixture
+    def late_rows(self, archive):
+        # A CDX server that ignores to=: one capture before the cutoff, one after
+        def handler(request):
+            fl = request.url.params["fl"].split(",")
+            rows = [
+                {"timestamp": ts, "original": f"https://example.com/{name}", "statuscode": "200", "urlkey": f"com,example)/{name}"}
+                for ts, name in (("20231115000000", "late"), ("20230301000000", "early"))
+            ]
+            return httpx.Response(200, json=[fl, *([row[f] for f in fl] for row in rows)])
+
+        archive.handler = handler
+        return archive
+
+    async def test_malformed_end_date_is_rejected(self, late_rows):
+        result = await list_available_snapshots.fn(
+            "example.com", start_date="2023-01-01", end_date="2023", cutoff_date="2023-06-01"
+        )
+        assert result.startswith("Error: Invalid end_date format '2023'")
+        assert late_rows.requests == []
+
+    async def test_listed_rows_after_cutoff_are_dropped(self, late_rows):
+        result = orjson.loads(await list_available_snapshots.fn("example.com", cutoff_date="2023-06-01"))
+        assert [s["date"] for s in result["snapshots"]] == ["2023-03-01"]
+
+    async def test_searched_rows_after_cutoff_are_dropped(self, late_rows):
+        result = orjson.loads(await search_site_archives.fn("example.com", cutoff_date="2023-06-01"))
+        assert [p["path"] for p in result["paths"]] == ["/early"]